@@ -40,11 +40,11 @@ Software License Agreement (BSD License)
 import aiohttp
 import argparse
 import asyncio
-from datetime import datetime
+from collections import OrderedDict, deque
 import discord
 from discord.ext import commands
-import itertools
-import json
+import functools
+import orjson
 import os.path as path
 import random
 import time
@@ -52,37 +52,152 @@ from urllib.parse import quote_plus
 
 
 def read_config(filename):
-    with open(filename, "r") as f:
-        return json.load(f)
+    with open(filename, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def gh_encode(x):
+    return quote_plus(x, safe='"')
+
+
+def preencode_labels(conf):
+    # labels only change on config reload, so encode the query fragments
+    # once up front instead of per request
+    conf["include_labels"] = tuple(
+        f'label:"{gh_encode(x)}"' for x in conf.get("include_labels", [])
+    )
+    conf["exclude_labels"] = tuple(
+        f'-label:"{gh_encode(x)}"' for x in conf.get("exclude_labels", [])
+    )
 
 
 bot = commands.Bot(command_prefix="!")
 command_config = read_config("command_config.json")
+for conf in command_config.values():
+    preencode_labels(conf)
 config = {}
 gh_auth = None
+session = None
+
+
+def get_session():
+    # One long-lived session so keep-alive reuses the connection to GitHub
+    # instead of paying a DNS + TLS handshake per page/PR fetch
+    global session
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            # gzip shrinks a search page roughly 5x on the wire;
+            # aiohttp decompresses transparently
+            headers={
+                "Accept": "application/vnd.github.v3+json",
+                "Accept-Encoding": "gzip",
+                "User-Agent": "pcl-discord-bot/1.0",
+                **(gh_auth or {}),
+            },
+            connector=aiohttp.TCPConnector(
+                limit=20, ttl_dns_cache=300, keepalive_timeout=75
+            ),
+        )
+    return session
+
+
+@bot.event
+async def on_disconnect():
+    global session
+    if session is not None and not session.closed:
+        await session.close()
+        session = None
 
 
 async def github_ratelimiter(headers, error_channel):
-    # If this is the last message before rate-limiting kicks in
-    if int(headers["X-RateLimit-Remaining"]) == 1:
-        epoch_sec = int(headers["X-RateLimit-Reset"])
-        delay = datetime.fromtimestamp(epoch_sec) - datetime.now()
-        # adding 1 to ensure we wait till after the rate-limit reset
-        sleep_time = delay.total_seconds() + 1
-        if sleep_time > 61:  # Waiting more than a minute is not kinda-sorta ok
-            await error_channel(
-                "API Request timed out", f"Try again after {sleep_time} seconds"
-            )
-            return sleep_time
+    # Proactive hint: if the quota is nearly spent, wait for the reset
+    # before firing more requests; gh_get handles actual 403/429 replies.
+    # Fast path first: almost every response is nowhere near the limit
+    if int(headers.get("X-RateLimit-Remaining", 5000)) >= 5:
+        return 0
+    # X-RateLimit-Reset is epoch seconds, the same clock as time.time();
+    # adding 1 to ensure we wait till after the rate-limit reset
+    sleep_time = int(headers["X-RateLimit-Reset"]) - time.time() + 1
+    if sleep_time > 61:  # Waiting more than a minute is not kinda-sorta ok
+        await error_channel(
+            "API Request timed out", f"Try again after {sleep_time} seconds"
+        )
+        return sleep_time
+    if sleep_time > 0:
         print(f"Need to sleep for {sleep_time}")
         await asyncio.sleep(sleep_time)
     return 0
 
 
-def error_handler(channel):
-    error = discord.Embed(color=discord.Color.red())
+async def gh_get(session, url, headers=None, max_retries=5, base_delay=1):
+    """
+    GET with retries. The status is inspected before raising so the
+    rate-limit headers on a 403/429 can steer the wait: an exhausted
+    primary quota sleeps towards X-RateLimit-Reset, a secondary limit
+    honors Retry-After, both with jitter and a 30s cap; 5xx just backs
+    off exponentially. Other errors (and the last attempt) raise.
+    """
+    for attempt in range(max_retries):
+        response = await session.get(url, headers=headers)
+        if response.status < 400:  # includes the conditional-request 304
+            return response
+        retryable = response.status in (403, 429) or response.status >= 500
+        if not retryable or attempt + 1 == max_retries:
+            response.raise_for_status()
+        status = response.status
+        resp_headers = response.headers
+        response.release()
+        if status in (403, 429):
+            if resp_headers.get("X-RateLimit-Remaining") == "0":
+                # primary quota exhausted: the reset time is authoritative
+                wait = int(resp_headers.get("X-RateLimit-Reset", 0)) - time.time() + 1
+            else:
+                wait = int(resp_headers.get("Retry-After", 0))
+            delay = max(wait, base_delay * 2 ** attempt)
+            delay = min(delay * (1 + random.random() * 0.5), 30)
+        else:  # 5xx
+            delay = min(base_delay * 2 ** attempt, 30)
+        print(f"GitHub replied {status}, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+# url -> (etag, parsed body), LRU-evicted to bound memory
+etag_cache = OrderedDict()
+ETAG_CACHE_SIZE = 256
+
+
+async def gh_get_json(session, url):
+    """
+    Conditional gh_get: sends If-None-Match when we hold an ETag for the
+    url and replays the cached body on a 304, which costs no rate-limit
+    quota. Returns the parsed body and the response headers.
+    """
+    cached = etag_cache.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else None
+    response = await gh_get(session, url, headers=headers)
+    async with response:
+        if response.status == 304:
+            etag_cache.move_to_end(url)
+            return cached[1], response.headers
+        data = await response.json(loads=orjson.loads)
+    etag = response.headers.get("ETag")
+    if etag:
+        etag_cache[url] = (etag, data)
+        etag_cache.move_to_end(url)
+        while len(etag_cache) > ETAG_CACHE_SIZE:
+            etag_cache.popitem(last=False)
+    return data, response.headers
+
+
+# immutable embed templates, cloned per message to skip re-constructing
+# Embed/Color objects in the reply path
+_ERROR_TEMPLATE = discord.Embed(color=discord.Color.red())
+_REPLY_TEMPLATE = discord.Embed(color=discord.Color.purple())
+
 
+def error_handler(channel):
     async def handler(title, description):
+        error = _ERROR_TEMPLATE.copy()
         error.title = title
         error.description = description
         await channel.send(embed=error)
@@ -94,117 +209,311 @@ async def default_error_handler(title, description):
     return True
 
 
+@functools.lru_cache(maxsize=64)
+def build_query_url(
+    repository, closed, pull_request, include_labels, exclude_labels, sort,
+    ascending_order,
+):
+    """
+    Assembles the search url; cached since the same command config asks
+    for the same url every time. Labels arrive as tuples of pre-encoded
+    label:"..." fragments (see preencode_labels)
+    """
+    closed = "closed" if closed else "open"
+    pull_request = "pr" if pull_request else "issue"
+    api_url = "https://api.github.com/search/issues?"
+    query = [
+        f"is:{pull_request}",
+        f"repo:{repository}",
+        f"is:{closed}",
+        *exclude_labels,
+        *include_labels,
+    ]
+
+    query_string = "q=" + "+".join(query)
+    sort_string = f"sort={sort}"
+    order_string = "order=" + ("asc" if ascending_order else "desc")
+
+    return api_url + "&".join([query_string, sort_string, order_string])
+
+
 async def get_issues(
     repository="PointCloudLibrary/pcl",
     closed=False,
     pull_request=False,
-    include_labels=[],
-    exclude_labels=[],
+    include_labels=(),
+    exclude_labels=(),
     sort="created",
     ascending_order=False,
     error_channel=default_error_handler,
 ):
-    closed = "closed" if closed else "open"
-    pull_request = "pr" if pull_request else "issue"
-    print(f"Getting list of {closed} {pull_request} from GitHub")
-
-    def gh_encode(x):
-        return quote_plus(x, safe='"')
-
-    api_url = "https://api.github.com/search/issues?"
-    # All query items are list of strings, which will be flattened later
-    excluded_labels = [f'-label:"{gh_encode(x)}"' for x in exclude_labels]
-    included_labels = [f'label:"{gh_encode(x)}"' for x in include_labels]
-    issue = [f"is:{pull_request}"]
-    repo = [f"repo:{repository}"]
-    status = [f"is:{closed}"]
-    query = [issue, repo, status, excluded_labels, included_labels]
-
-    query_string = "q=" + "+".join(itertools.chain.from_iterable(query))
-    sort_string = f"sort={sort}"
-    order_string = "order=" + ("asc" if ascending_order else "desc")
+    print(
+        f"Getting list of {'closed' if closed else 'open'}"
+        f" {'pr' if pull_request else 'issue'} from GitHub"
+    )
 
-    query_url = api_url + "&".join([query_string, sort_string, order_string])
+    query_url = build_query_url(
+        repository,
+        closed,
+        pull_request,
+        include_labels,
+        exclude_labels,
+        sort,
+        ascending_order,
+    )
 
     print(query_url)
 
-    data_count = 0
-    page = 1
-    while True:
+    session = get_session()
+    # GitHub discourages more than a handful of concurrent requests
+    semaphore = asyncio.Semaphore(5)
+
+    async def fetch_page(page):
         # max pagination size is 100 as of github api v3
         search_url = f"{query_url}&page={page}&per_page=100"
-        async with aiohttp.ClientSession() as session:
-            try:
-                response = await session.get(
-                    search_url, raise_for_status=True, headers=gh_auth
-                )
-            except TimeoutError:
-                await error_channel(
-                    "API Request timed out",
-                    "Please check https://www.githubstatus.com/",
-                )
-                break
-            async with response:
-                data = await response.json()
-                total_count = data["total_count"]
-                data_count += len(data["items"])
-                for item in data["items"]:
-                    yield item
-                page += 1
-                if await github_ratelimiter(response.headers, error_channel):
-                    break
-                # exit if all data has been received
-                if data_count == total_count:
-                    break
+        async with semaphore:
+            data, headers = await gh_get_json(session, search_url)
+            await github_ratelimiter(headers, error_channel)
+            return data
+
+    data_count = 0
+    try:
+        data = await fetch_page(1)
+    except TimeoutError:
+        await error_channel(
+            "API Request timed out", "Please check https://www.githubstatus.com/",
+        )
+        return
+    total_count = data["total_count"]
+    data_count += len(data["items"])
+    for item in data["items"]:
+        yield item
+
+    # page 1 told us the total, so fetch the remaining pages concurrently
+    n_pages = -(-total_count // 100)  # ceil division
+    tasks = [asyncio.create_task(fetch_page(p)) for p in range(2, n_pages + 1)]
+    try:
+        for data in await asyncio.gather(*tasks):
+            data_count += len(data["items"])
+            for item in data["items"]:
+                yield item
+    except TimeoutError:
+        await error_channel(
+            "API Request timed out", "Please check https://www.githubstatus.com/",
+        )
+        return
+    finally:
+        # the consumer may stop iterating early; don't leave pages in flight
+        for task in tasks:
+            task.cancel()
     print(f"Found {data_count} entries")
 
 
+# query_url -> (monotonic timestamp, collected issue list)
+issue_cache = OrderedDict()
+ISSUE_CACHE_TTL = 60
+ISSUE_CACHE_SIZE = 32
+_issue_cache_locks = {}
+
+
+async def cached_get_issues(
+    repository="PointCloudLibrary/pcl",
+    closed=False,
+    pull_request=False,
+    include_labels=(),
+    exclude_labels=(),
+    sort="created",
+    ascending_order=False,
+    error_channel=default_error_handler,
+):
+    """
+    TTL cache in front of get_issues: back-to-back identical commands
+    within ISSUE_CACHE_TTL seconds replay the already-collected list,
+    and a per-url lock coalesces simultaneous invocations into a single
+    fetch. A consumer that stops early leaves the cache untouched
+    """
+    url = build_query_url(
+        repository,
+        closed,
+        pull_request,
+        include_labels,
+        exclude_labels,
+        sort,
+        ascending_order,
+    )
+    lock = _issue_cache_locks.setdefault(url, asyncio.Lock())
+    await lock.acquire()
+    cached = issue_cache.get(url)
+    if cached and time.monotonic() - cached[0] < ISSUE_CACHE_TTL:
+        issue_cache.move_to_end(url)
+        lock.release()
+        print(f"Replaying {len(cached[1])} cached entries")
+        for item in cached[1]:
+            yield item
+        return
+    try:
+        items = []
+        async for item in get_issues(
+            repository=repository,
+            closed=closed,
+            pull_request=pull_request,
+            include_labels=include_labels,
+            exclude_labels=exclude_labels,
+            sort=sort,
+            ascending_order=ascending_order,
+            error_channel=error_channel,
+        ):
+            items.append(item)
+            yield item
+        # only reached when the stream was drained completely
+        issue_cache[url] = (time.monotonic(), items)
+        while len(issue_cache) > ISSUE_CACHE_SIZE:
+            issue_cache.popitem(last=False)
+    finally:
+        lock.release()
+
+
+async def fetch_pr(session, url, semaphore, error_channel=default_error_handler):
+    async with semaphore:
+        pr_data, headers = await gh_get_json(session, url)
+        await github_ratelimiter(headers, error_channel)
+        return pr_data
+
+
 async def get_pr_details(issues, error_channel=lambda title, desc: True):
+    """
+    Streams PR details for an async iterable of issues, keeping a small
+    window of detail fetches in flight so an early-stopping consumer
+    also stops the upstream pagination
+    """
     print("Getting more details about the PRs")
+    session = get_session()
+    semaphore = asyncio.Semaphore(5)
+    window = deque()
     counter = 0
-    for issue in issues:
-        async with aiohttp.ClientSession() as session:
-            try:
-                response = await session.get(
-                    issue["pull_request"]["url"], raise_for_status=True, headers=gh_auth
-                )
-            except TimeoutError:
-                await error_channel(
-                    "API Request timed out",
-                    "Please check https://www.githubstatus.com/",
+    try:
+        async for issue in issues:
+            window.append(
+                asyncio.create_task(
+                    fetch_pr(
+                        session,
+                        issue["pull_request"]["url"],
+                        semaphore,
+                        error_channel,
+                    )
                 )
-                break
-            async with response:
-                pr_data = await response.json()
+            )
+            # awaiting in task order keeps the yielded PRs in request order
+            if len(window) >= 5:
+                pr_data = await window.popleft()
                 counter += 1
                 yield pr_data
-                if await github_ratelimiter(response.headers, error_channel):
-                    break
+        while window:
+            pr_data = await window.popleft()
+            counter += 1
+            yield pr_data
+    except TimeoutError:
+        await error_channel(
+            "API Request timed out", "Please check https://www.githubstatus.com/",
+        )
+    finally:
+        # whether the consumer stopped early or a fetch failed, no task
+        # may outlive this generator, and the issue stream must wind down
+        for task in window:
+            task.cancel()
+        aclose = getattr(issues, "aclose", None)
+        if aclose is not None:
+            await aclose()
     print(f"Received data about {counter} PRs")
 
 
-async def pr_with_pending_review(pr_list, user):
+GRAPHQL_URL = "https://api.github.com/graphql"
+GRAPHQL_BATCH = 25
+
+
+def build_reviewers_query(repository, numbers):
+    owner, _, name = repository.partition("/")
+    fields = " ".join(
+        f"pr{i}: pullRequest(number: {n}) {{ reviewRequests(first: 20)"
+        " { nodes { requestedReviewer { ... on User { login } } } } }"
+        for i, n in enumerate(numbers)
+    )
+    return f'{{ repository(owner: "{owner}", name: "{name}") {{ {fields} }} }}'
+
+
+async def fetch_reviewers_batch(session, batch):
+    # owner/name can be recovered from any search item's repository_url
+    repository = "/".join(batch[0]["repository_url"].split("/")[-2:])
+    numbers = [issue["number"] for issue in batch]
+    query = build_reviewers_query(repository, numbers)
+    response = await session.post(
+        GRAPHQL_URL, json={"query": query}, raise_for_status=True
+    )
+    async with response:
+        data = await response.json(loads=orjson.loads)
+    prs = []
+    for i, issue in enumerate(batch):
+        nodes = data["data"]["repository"][f"pr{i}"]["reviewRequests"]["nodes"]
+        pr = dict(issue)
+        pr["requested_reviewers"] = [
+            {"login": node["requestedReviewer"]["login"]}
+            for node in nodes
+            if node["requestedReviewer"]
+        ]
+        prs.append(pr)
+    return prs
+
+
+async def get_requested_reviewers(issues, error_channel=default_error_handler):
     """
-    Generates PR which need to be reviewed by the user
+    Augments each streamed PR with its requested_reviewers via one
+    GraphQL POST per GRAPHQL_BATCH PRs instead of one REST GET each.
+    GraphQL requires a token, so unauthorized setups fall back to the
+    per-PR REST fetch
     """
-    print(f"Filtering for @{user}")
-    async for pr in pr_list:
-        for reviewer in pr["requested_reviewers"]:
-            if reviewer["login"] == user:
+    if not gh_auth:
+        async for pr in get_pr_details(issues, error_channel):
+            yield pr
+        return
+    print("Batching reviewer lookups through GraphQL")
+    session = get_session()
+    batch = []
+    try:
+        async for issue in issues:
+            batch.append(issue)
+            if len(batch) == GRAPHQL_BATCH:
+                for pr in await fetch_reviewers_batch(session, batch):
+                    yield pr
+                batch = []
+        if batch:
+            for pr in await fetch_reviewers_batch(session, batch):
                 yield pr
+    finally:
+        aclose = getattr(issues, "aclose", None)
+        if aclose is not None:
+            await aclose()
 
 
-def beautify_issues(github_issue_list):
-    req_details = ["title", "body", "html_url", "created_at", "updated_at"]
-    return [{x: issue[x] for x in req_details} for issue in github_issue_list]
+async def pr_with_pending_review(pr_list, user):
+    """
+    Generates PR which need to be reviewed by the user
+    """
+    print(f"Filtering for @{user}")
+    try:
+        async for pr in pr_list:
+            for reviewer in pr["requested_reviewers"]:
+                if reviewer["login"] == user:
+                    yield pr
+    finally:
+        await pr_list.aclose()
 
 
 def compose_message(issues):
-    issue_data = [
-        f'**{i+1}.** {issue["title"]}\n  {issue["html_url"]}'
-        for i, issue in enumerate(issues)
-    ]
-    return "\n".join(issue_data)
+    # works on raw GitHub issues; only title and html_url are needed
+    return "\n".join(
+        f'**{i}.** {issue["title"]}\n  {issue["html_url"]}'
+        for i, issue in enumerate(issues, 1)
+    )
 
 
 async def set_playing(status):
@@ -258,30 +567,41 @@ async def check_author(ctx, noun, error_channel=default_error_handler):
 
 async def choose_rand(issues, number_of_issues):
     """
-    @TODO: improve algorithm to save queries
-    1. get first batch of github_max (100), find total number
-    2. if total < requested, return all
-    3. Generate requested random numbers
-    4. get issues till max(generated_list)
-    5. return them
+    Reservoir sampling (Algorithm R) over the issue stream: keeps at most
+    number_of_issues picks in memory instead of the full issue list.
+    Picks are distinct, like random.sample and unlike random.choices
     """
-    chosen_issues = random.choices(issues, k=number_of_issues)
-    title = f"{number_of_issues} random picks out of {len(issues)}:"
+    reservoir = []
+    seen = 0
+    async for issue in issues:
+        seen += 1
+        if len(reservoir) < number_of_issues:
+            reservoir.append(issue)
+        else:
+            slot = random.randrange(seen)
+            if slot < number_of_issues:
+                reservoir[slot] = issue
+    title = f"{len(reservoir)} random picks out of {seen}:"
 
-    return chosen_issues, title
+    return reservoir, title
 
 
 async def choose_review(issues, number_of_issues, author):
     chosen_issues = []
     if author:
-        issues = pr_with_pending_review(get_pr_details(issues), author)
+        prs = pr_with_pending_review(get_requested_reviewers(issues), author)
         # since async islice doesn't exist
-        async for issue in issues:
+        async for issue in prs:
             chosen_issues.append(issue)
             if len(chosen_issues) == number_of_issues:
                 break
+        # winds down the whole pipeline, pagination included
+        await prs.aclose()
     else:
-        chosen_issues = issues[:number_of_issues]
+        async for issue in issues:
+            chosen_issues.append(issue)
+            if len(chosen_issues) == number_of_issues:
+                break
 
     selection = f"for @{author}" if author else f"in review queue"
     title = f"Oldest {number_of_issues} PR(s) {selection}:"
@@ -290,7 +610,12 @@ async def choose_review(issues, number_of_issues, author):
 
 
 async def choose_feedback(issues, number_of_issues, pull_request):
-    chosen_issues = issues[:number_of_issues]
+    # results arrive oldest-first, so stop as soon as we have enough
+    chosen_issues = []
+    async for issue in issues:
+        chosen_issues.append(issue)
+        if len(chosen_issues) == number_of_issues:
+            break
 
     kind = "PR(s)" if pull_request else "issue(s)"
     title = f"Oldest {number_of_issues} {kind} in feedback queue:"
@@ -298,81 +623,62 @@ async def choose_feedback(issues, number_of_issues, pull_request):
     return chosen_issues, title
 
 
+async def _run_command(ctx, name, conf, number_of_issues, noun, channel):
+    """
+    Shared body of the configured commands; dispatches on name directly
+    instead of manufacturing closures per invocation
+    """
+    reply = _REPLY_TEMPLATE.copy()
+    if channel is None:
+        channel = ctx.channel
+    error_channel = error_handler(channel)
+
+    # command specific checks
+    number_of_issues = await check_number_of_issues(number_of_issues, error_channel)
+    if name == "rq":
+        pull_request = True
+        author = await check_author(ctx, noun, error_channel)
+    else:  # rand, fq
+        pull_request = await check_pull_request(noun, error_channel)
+        author = None
+
+    await set_playing("On The Cue")
+    async with channel.typing():
+        # async generator: the choosers stream from it and may stop early
+        issues = cached_get_issues(
+            **conf, pull_request=pull_request, error_channel=error_channel
+        )
+
+        if name == "rand":
+            chosen_issues, reply.title = await choose_rand(issues, number_of_issues)
+        elif name == "rq":
+            chosen_issues, reply.title = await choose_review(
+                issues, number_of_issues, author
+            )
+        else:  # fq
+            chosen_issues, reply.title = await choose_feedback(
+                issues, number_of_issues, pull_request
+            )
+
+        reply.description = compose_message(chosen_issues)
+        if len(chosen_issues) < number_of_issues:
+            reply.set_footer(text="There weren't enough...")
+    await channel.send(embed=reply)
+    await set_playing("The Waiting Game")
+
+
 for name, conf in command_config.items():
     # name=name and conf=conf used to prevent late binding
     @bot.command(name=name)
     async def command_function(
         ctx, number_of_issues: int, noun=None, channel=None, name=name, conf=conf
     ):
-        reply = discord.Embed(color=discord.Color.purple())
-        if channel is None:
-            channel = ctx.channel
-        error_channel = error_handler(channel)
-
-        def delay(x, *args, **kwargs):
-            async def actual_waiter():
-                return await x(*args, **kwargs)
-
-            return actual_waiter
-
-        check_order = [
-            delay(
-                check_number_of_issues,
-                number_of_issues=number_of_issues,
-                error_channel=error_channel,
-            ),
-            delay(check_pull_request, noun=noun, error_channel=error_channel),
-            delay(check_author, ctx=ctx, noun=noun, error_channel=error_channel),
-        ]
-
-        # command specific checks
-        if name in ["rand", "fq"]:
-            number_of_issues = await check_order[0]()
-            pull_request = await check_order[1]()
-            author = None
-        if name in ["rq"]:
-            number_of_issues = await check_order[0]()
-            pull_request = True
-            author = await check_order[2]()
-
-        await set_playing("On The Cue")
-        async with channel.typing():
-            issues = [
-                x
-                async for x in get_issues(
-                    **conf, pull_request=pull_request, error_channel=error_channel
-                )
-            ]
-
-            choose_for_commands = {
-                "rand": delay(
-                    choose_rand, issues=issues, number_of_issues=number_of_issues
-                ),
-                "rq": delay(
-                    choose_review,
-                    issues=issues,
-                    number_of_issues=number_of_issues,
-                    author=author,
-                ),
-                "fq": delay(
-                    choose_feedback,
-                    issues=issues,
-                    number_of_issues=number_of_issues,
-                    pull_request=pull_request,
-                ),
-            }
-            chosen_issues, reply.title = await choose_for_commands[name]()
-
-            reply.description = compose_message(beautify_issues(chosen_issues))
-            if len(chosen_issues) < number_of_issues:
-                reply.set_footer(text="There weren't enough...")
-        await channel.send(embed=reply)
-        await set_playing("The Waiting Game")
+        await _run_command(ctx, name, conf, number_of_issues, noun, channel)
 
 
 @bot.command(name="what")
 async def what_cmd(ctx):
-    reply = discord.Embed(color=discord.Color.purple())
+    reply = _REPLY_TEMPLATE.copy()
     reply.title = "Command list for GitHub Helper"
     reply.description = """`!rand <N> issue/pr`
 Retrieves N random open, non-stale issue(s)/PR(s)
@@ -387,7 +693,7 @@ Retrieves N least-recently-updated issue(s)/PR(s) in the feedback queue"""
 
 @bot.event
 async def on_command_error(ctx, error):
-    reply = discord.Embed(color=discord.Color.purple())
+    reply = _REPLY_TEMPLATE.copy()
     reply.description = "Talking to me? Use `!what` to know more."
     if (
         isinstance(error, discord.ext.commands.errors.BadArgument)
@@ -414,13 +720,13 @@ for name in ["review", "q"]:
 
 async def oneshot(channel_id, n):
     await bot.wait_until_ready()
-    await command_function(
+    await _run_command(
         ctx=None,
+        name="rand",
+        conf=command_config["rand"],
         number_of_issues=n,
         noun="issue",
         channel=bot.get_channel(channel_id),
-        name="rand",
-        conf=command_config["rand"],
     )
     await bot.close()
 